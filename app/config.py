@@ -16,11 +16,14 @@ class Settings(BaseSettings):
     # Scheduler Configuration
     ENABLE_SCHEDULER: bool = True
     
+    # API Configuration
+    ENABLE_CORS: bool = True  # Disable when a reverse proxy already handles CORS
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
         extra = "ignore"  # Ignore extra fields in .env file
 
-@lru_cache()
+@lru_cache(maxsize=None)
 def get_settings():
     return Settings()
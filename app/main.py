@@ -1,10 +1,13 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, timedelta
-from app.mongodb_service import MongoDBService
-from app.tasks import fetch_and_post_cricket_news
+from fastapi.responses import ORJSONResponse
+from datetime import datetime
+from app.mongodb_service import MongoDBService, create_mongo_client, ARTICLE_TTL_SECONDS
+from app.tasks import fetch_and_post_cricket_news, close_services
 from app.scheduler import scheduler
+from app.services.news_fetcher import close_client
 from app.config import get_settings
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -23,35 +26,48 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting FastAPI Cricket News Bot...")
     
+    app.state.mongo_client = create_mongo_client()
+    await MongoDBService(app.state.mongo_client).setup_indexes()
+    
     if settings.ENABLE_SCHEDULER:
         try:
-            scheduler.start()
+            await scheduler.start(MongoDBService(app.state.mongo_client))
             logger.info("✅ Scheduler started successfully")
         except Exception as e:
-            logger.error(f"❌ Failed to start scheduler: {e}")
+            logger.error("❌ Failed to start scheduler: %s", e)
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down...")
     if scheduler.running:
-        scheduler.stop()
+        await scheduler.stop()
+    await close_services()
+    await close_client()
+    app.state.mongo_client.close()
 
 app = FastAPI(
     title="Cricket News Bot API",
     description="Automated cricket news fetching and posting to Telegram",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS middleware (skipped entirely when CORS is handled upstream)
+if settings.ENABLE_CORS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+async def get_mongo_service(request: Request) -> MongoDBService:
+    """Per-request MongoDB service backed by the shared connection pool"""
+    # async so FastAPI calls it inline instead of dispatching it to the threadpool
+    return MongoDBService(request.app.state.mongo_client)
 
 @app.get("/")
 async def root():
@@ -78,23 +94,19 @@ async def health_check():
     }
 
 @app.get("/api/articles")
-async def get_articles():
+async def get_articles(mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Get all posted articles"""
-    mongodb_service = MongoDBService()
     try:
-        articles = mongodb_service.get_articles()
+        articles = await mongodb_service.get_articles()
         return articles
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        mongodb_service.close_connection()
 
 @app.get("/api/headlines")
-async def get_headlines():
+async def get_headlines(mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Get today's headlines only"""
-    mongodb_service = MongoDBService()
     try:
-        todays_articles = mongodb_service.get_todays_articles()
+        todays_articles = await mongodb_service.get_todays_articles()
         return {
             'date': datetime.utcnow().date().isoformat(),
             'count': len(todays_articles),
@@ -102,16 +114,15 @@ async def get_headlines():
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        mongodb_service.close_connection()
 
 @app.get("/api/status")
-async def get_bot_status():
+async def get_bot_status(mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Get bot status and statistics"""
-    mongodb_service = MongoDBService()
     try:
-        latest_status = mongodb_service.get_latest_bot_status()
-        stats = mongodb_service.get_statistics()
+        latest_status, stats = await asyncio.gather(
+            mongodb_service.get_latest_bot_status(),
+            mongodb_service.get_statistics()
+        )
         
         if latest_status:
             latest_status.update(stats)
@@ -125,11 +136,9 @@ async def get_bot_status():
             }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        mongodb_service.close_connection()
 
 @app.post("/api/trigger")
-async def trigger_news_fetch(request: Request):
+async def trigger_news_fetch(request: Request, mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Manually trigger news fetch and post"""
     start_time = datetime.utcnow()
     
@@ -137,15 +146,15 @@ async def trigger_news_fetch(request: Request):
     user_agent = request.headers.get('user-agent', 'Unknown')
     client_host = request.client.host if request.client else 'Unknown'
     
-    logger.info(f"🚀 News fetch triggered by {user_agent} from {client_host}")
+    logger.info("🚀 News fetch triggered by %s from %s", user_agent, client_host)
     
     try:
-        result = fetch_and_post_cricket_news()
+        result = await fetch_and_post_cricket_news(mongodb_service)
         
         end_time = datetime.utcnow()
         duration = (end_time - start_time).total_seconds()
         
-        logger.info(f"✅ Manual trigger completed in {duration:.1f}s")
+        logger.info("✅ Manual trigger completed in %.1fs", duration)
         
         return {
             'success': True,
@@ -160,7 +169,7 @@ async def trigger_news_fetch(request: Request):
         end_time = datetime.utcnow()
         duration = (end_time - start_time).total_seconds()
         
-        logger.error(f"❌ Manual trigger failed after {duration:.1f}s: {e}")
+        logger.error("❌ Manual trigger failed after %.1fs: %s", duration, e)
         
         raise HTTPException(
             status_code=500,
@@ -175,19 +184,17 @@ async def trigger_news_fetch(request: Request):
         )
 
 @app.post("/api/cleanup")
-async def cleanup_old_data():
-    """Manually trigger cleanup of old articles"""
-    mongodb_service = MongoDBService()
+async def cleanup_old_data(mongodb_service: MongoDBService = Depends(get_mongo_service)):
+    """Manually sweep old articles (normally expired by the TTL index)"""
     try:
-        cleaned_count = mongodb_service.cleanup_old_articles()
+        cleaned_count = await mongodb_service.cleanup_old_articles()
         return {
             'message': f'Successfully cleaned up {cleaned_count} old articles',
-            'cleaned_count': cleaned_count
+            'cleaned_count': cleaned_count,
+            'ttl_expire_after_seconds': ARTICLE_TTL_SECONDS
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        mongodb_service.close_connection()
 
 @app.get("/api/scheduler/status")
 async def scheduler_status():
@@ -204,7 +211,7 @@ async def scheduler_status():
         'schedule_type': 'hourly',
         'next_runs': {
             'news_fetch': f'Every hour at :00 (next: {next_hour.strftime("%H:00 UTC")})',
-            'cleanup': '3:00 AM UTC daily (8:30 AM IST)'
+            'cleanup': 'Continuous (MongoDB TTL index, 7 days)'
         },
         'articles_per_run': '5 articles (ESPN priority, NewsAPI fallback)',
         'frequency': 'Every hour (24 times daily)',
@@ -212,11 +219,11 @@ async def scheduler_status():
     }
 
 @app.post("/api/scheduler/start")
-async def start_scheduler():
+async def start_scheduler(mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Manually start the scheduler"""
     try:
         if not scheduler.running:
-            scheduler.start()
+            await scheduler.start(mongodb_service)
             return {
                 'message': 'Scheduler started successfully',
                 'status': 'started'
@@ -236,42 +243,36 @@ async def start_scheduler():
         )
 
 @app.get("/api/scheduler/health")
-async def scheduler_health():
+async def scheduler_health(mongodb_service: MongoDBService = Depends(get_mongo_service)):
     """Detailed scheduler health check"""
     try:
-        mongodb_service = MongoDBService()
-        
         scheduler_running = scheduler.running
-        tasks = mongodb_service.get_scheduled_tasks()
+        tasks = await mongodb_service.get_scheduled_tasks()
         
-        # Calculate next run times
+        # Next run times come straight from APScheduler's job store
         now = datetime.utcnow()
+        next_run_times = scheduler.get_next_run_times()
         next_runs = []
         
         for task in tasks:
             schedule = task['schedule']
-            next_run = now.replace(
-                hour=schedule['hour'],
-                minute=schedule['minute'],
-                second=0,
-                microsecond=0
-            )
-            
-            if next_run <= now:
-                next_run = next_run + timedelta(days=1)
+            if 'hour' in schedule:
+                schedule_text = f"{schedule['hour']:02d}:{schedule['minute']:02d} UTC"
+            else:
+                schedule_text = f"Every hour at :{schedule['minute']:02d}"
             
+            next_run = next_run_times.get(task['name'])
+            last_run = task.get('last_run')
             next_runs.append({
                 'task': task['name'],
-                'next_run': next_run.isoformat(),
-                'schedule': f"{schedule['hour']:02d}:{schedule['minute']:02d} UTC",
-                'last_run': task.get('last_run').isoformat() if task.get('last_run') else None
+                'next_run': next_run.isoformat() if next_run else None,
+                'schedule': schedule_text,
+                'last_run': last_run.isoformat() if last_run else None
             })
         
-        mongodb_service.close_connection()
-        
         return {
             'scheduler_running': scheduler_running,
-            'scheduler_thread_alive': scheduler.thread.is_alive() if scheduler.thread else False,
+            'scheduler_thread_alive': scheduler_running,
             'total_tasks': len(tasks),
             'enabled_tasks': len([t for t in tasks if t.get('enabled', True)]),
             'next_runs': next_runs,
@@ -1,155 +1,216 @@
-from pymongo import MongoClient, ASCENDING
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from datetime import datetime, timedelta
+from operator import itemgetter
 from app.config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Articles are expired by MongoDB's TTL monitor once they are 7 days old
+ARTICLE_TTL_SECONDS = 7 * 24 * 3600
+# Server error code for an existing index with the same keys but different options
+_INDEX_OPTIONS_CONFLICT = 85
+
+# Only the fields the API returns
+_ARTICLE_PROJECTION = {
+    'title': 1,
+    'link': 1,
+    'image_url': 1,
+    'description': 1,
+    'source': 1,
+    'posted_at': 1,
+    'is_posted': 1
+}
+_article_fields = itemgetter('_id', 'title', 'link', 'source', 'posted_at', 'is_posted')
+_today_window_cache = None
+
+def _today_window():
+    """Start and end of the current UTC day, recomputed only once the day rolls over"""
+    global _today_window_cache
+    now = datetime.utcnow()
+    if _today_window_cache is None or now >= _today_window_cache[1]:
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        _today_window_cache = (today_start, today_start + timedelta(days=1))
+    return _today_window_cache
+
+def _article_document(article_data):
+    """Build the document stored for a newly seen article"""
+    return {
+        'title': article_data['title'],
+        'link': article_data['link'],
+        'image_url': article_data.get('image_url'),
+        'description': article_data.get('description'),
+        'source': article_data['source'],
+        'posted_at': datetime.utcnow(),
+        'is_posted': article_data.get('is_posted', False)
+    }
+
+def _serialize_article(article):
+    """Convert an article document into its API representation"""
+    article_id, title, link, source, posted_at, is_posted = _article_fields(article)
+    return {
+        'id': str(article_id),
+        'title': title,
+        'link': link,
+        'image_url': article.get('image_url'),
+        'description': article.get('description'),
+        'source': source,
+        'posted_at': posted_at.isoformat(),
+        'is_posted': is_posted
+    }
+
+def create_mongo_client():
+    """Create the shared MongoDB client (one connection pool per process)"""
+    try:
+        client = AsyncIOMotorClient(settings.MONGO_STRING, maxPoolSize=20, minPoolSize=5)
+        logger.info("✅ Connected to MongoDB")
+        return client
+    except Exception as e:
+        logger.error("❌ Failed to connect to MongoDB: %s", e)
+        raise
+
 class MongoDBService:
     """Pure MongoDB service for all data operations"""
     
-    def __init__(self):
-        try:
-            self.client = MongoClient(settings.MONGO_STRING)
-            self.db = self.client[settings.MONGODB_DATABASE]
-            logger.info("✅ Connected to MongoDB")
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to MongoDB: {e}")
-            raise
+    _indexes_built = False
+    
+    def __init__(self, client):
+        self.client = client
+        self.db = self.client[settings.MONGODB_DATABASE]
         
         # Collections
         self.articles_collection = self.db['news_articles']
         self.bot_status_collection = self.db['bot_status']
         self.scheduler_collection = self.db['scheduler_tasks']
-        
-        # Setup indexes
-        self._setup_indexes()
     
-    def _setup_indexes(self):
-        """Setup MongoDB indexes for better performance"""
+    async def setup_indexes(self):
+        """Setup MongoDB indexes for better performance (once per process)"""
+        if MongoDBService._indexes_built:
+            return
+        
         try:
-            self.articles_collection.create_index([('title', ASCENDING), ('source', ASCENDING)], unique=True)
-            self.articles_collection.create_index([('posted_at', ASCENDING)])
-            self.articles_collection.create_index([('is_posted', ASCENDING)])
-            self.bot_status_collection.create_index([('last_run', ASCENDING)])
-            self.scheduler_collection.create_index([('name', ASCENDING)], unique=True)
-            self.scheduler_collection.create_index([('enabled', ASCENDING)])
+            await self.articles_collection.create_index([('title', ASCENDING), ('source', ASCENDING)], unique=True)
+            await self._setup_ttl_index()
+            # Serves the posted counts (range on posted_at within is_posted) from the index alone;
+            # posted_at itself stays a single-field index because TTL indexes cannot be compound
+            await self.articles_collection.create_index([('is_posted', ASCENDING), ('posted_at', DESCENDING)])
+            try:
+                # Superseded by the compound index above, which has is_posted as its prefix
+                await self.articles_collection.drop_index('is_posted_1')
+            except OperationFailure:
+                pass
+            await self.bot_status_collection.create_index([('last_run', ASCENDING)])
+            await self.scheduler_collection.create_index([('name', ASCENDING)], unique=True)
+            await self.scheduler_collection.create_index([('enabled', ASCENDING)])
+            MongoDBService._indexes_built = True
             logger.info("✅ MongoDB indexes setup completed")
         except Exception as e:
-            logger.error(f"Error setting up indexes: {e}")
+            logger.error("Error setting up indexes: %s", e)
     
-    def save_article(self, article_data):
-        """Save article to MongoDB"""
+    async def _setup_ttl_index(self):
+        """Create the posted_at TTL index; a failure here doesn't stop the other indexes"""
         try:
-            article_doc = {
-                'title': article_data['title'],
-                'link': article_data['link'],
-                'image_url': article_data.get('image_url'),
-                'description': article_data.get('description'),
-                'source': article_data['source'],
-                'posted_at': datetime.utcnow(),
-                'is_posted': article_data.get('is_posted', False)
-            }
-            
-            result = self.articles_collection.update_one(
+            try:
+                await self.articles_collection.create_index(
+                    [('posted_at', ASCENDING)],
+                    expireAfterSeconds=ARTICLE_TTL_SECONDS
+                )
+            except OperationFailure as e:
+                if e.code != _INDEX_OPTIONS_CONFLICT:
+                    raise
+                # Convert the plain posted_at index from older deployments in place
+                await self.db.command(
+                    'collMod',
+                    self.articles_collection.name,
+                    index={'keyPattern': {'posted_at': 1}, 'expireAfterSeconds': ARTICLE_TTL_SECONDS}
+                )
+        except Exception as e:
+            logger.error("❌ Could not set up the posted_at TTL index, old articles won't expire: %s", e)
+    
+    async def save_articles_bulk(self, articles):
+        """Upsert many articles in one round-trip; returns {index: _id} for the newly inserted ones"""
+        if not articles:
+            return {}
+        
+        ops = [
+            UpdateOne(
                 {'title': article_data['title'], 'source': article_data['source']},
-                {'$setOnInsert': article_doc},
+                {'$setOnInsert': _article_document(article_data)},
                 upsert=True
             )
-            
-            if result.upserted_id:
-                logger.info(f"Saved new article: {article_data['title'][:50]}...")
-                return str(result.upserted_id)
-            else:
-                logger.info(f"Article already exists: {article_data['title'][:50]}...")
-                existing = self.articles_collection.find_one(
-                    {'title': article_data['title'], 'source': article_data['source']}
-                )
-                return str(existing['_id']) if existing else None
-        except Exception as e:
-            logger.error(f"Error saving article: {e}")
-            return None
+            for article_data in articles
+        ]
+        
+        # Other errors propagate: an empty result would read as "no new articles" to the caller
+        try:
+            result = await self.articles_collection.bulk_write(ops, ordered=False)
+            upserted_ids = result.upserted_ids
+        except BulkWriteError as e:
+            # A concurrent insert can trip the unique index; the other upserts still went through
+            logger.error("Error in bulk article save: %s", e.details.get('writeErrors'))
+            upserted_ids = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+        
+        logger.info("Saved %s new of %s articles", len(upserted_ids), len(articles))
+        return upserted_ids
     
-    def get_articles(self, limit=50):
+    async def get_articles(self, limit=50):
         """Get all articles from MongoDB"""
         try:
-            articles = list(self.articles_collection.find().sort('posted_at', -1).limit(limit))
-            return [
-                {
-                    'id': str(article['_id']),
-                    'title': article['title'],
-                    'link': article['link'],
-                    'image_url': article.get('image_url'),
-                    'description': article.get('description'),
-                    'source': article['source'],
-                    'posted_at': article['posted_at'].isoformat(),
-                    'is_posted': article['is_posted']
-                }
-                for article in articles
-            ]
+            # batch_size=limit fetches the whole page in a single server reply
+            cursor = self.articles_collection.find(projection=_ARTICLE_PROJECTION).sort('posted_at', -1).limit(limit).batch_size(limit)
+            return [_serialize_article(article) async for article in cursor]
         except Exception as e:
-            logger.error(f"Error fetching articles: {e}")
+            logger.error("Error fetching articles: %s", e)
             return []
     
-    def get_todays_articles(self):
+    async def get_todays_articles(self):
         """Get today's articles from MongoDB"""
         try:
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_end = today_start + timedelta(days=1)
+            today_start, today_end = _today_window()
             
-            articles = list(self.articles_collection.find({
-                'posted_at': {'$gte': today_start, '$lt': today_end}
-            }).sort('posted_at', -1))
+            cursor = self.articles_collection.find(
+                {'posted_at': {'$gte': today_start, '$lt': today_end}},
+                projection=_ARTICLE_PROJECTION
+            ).sort('posted_at', -1)
             
-            return [
-                {
-                    'id': str(article['_id']),
-                    'title': article['title'],
-                    'link': article['link'],
-                    'image_url': article.get('image_url'),
-                    'description': article.get('description'),
-                    'source': article['source'],
-                    'posted_at': article['posted_at'].isoformat(),
-                    'is_posted': article['is_posted']
-                }
-                for article in articles
-            ]
+            return [_serialize_article(article) async for article in cursor]
         except Exception as e:
-            logger.error(f"Error fetching today's articles: {e}")
+            logger.error("Error fetching today's articles: %s", e)
             return []
     
-    def article_exists(self, title, source):
-        """Check if article exists in MongoDB"""
-        try:
-            return self.articles_collection.find_one({'title': title, 'source': source}) is not None
-        except Exception as e:
-            logger.error(f"Error checking article existence: {e}")
-            return False
-    
-    def mark_article_posted(self, title, source):
-        """Mark article as posted in MongoDB"""
+    async def mark_articles_posted(self, keys):
+        """Mark many articles, given as (title, source) pairs, as posted in one round-trip"""
+        if not keys:
+            return 0
+        
+        ops = [
+            UpdateOne({'title': title, 'source': source}, {'$set': {'is_posted': True}})
+            for title, source in keys
+        ]
+        
         try:
-            self.articles_collection.update_one(
-                {'title': title, 'source': source},
-                {'$set': {'is_posted': True}}
-            )
+            result = await self.articles_collection.bulk_write(ops, ordered=False)
+            return result.modified_count
         except Exception as e:
-            logger.error(f"Error marking article as posted: {e}")
+            logger.error("Error marking articles as posted: %s", e)
+            return 0
     
-    def cleanup_old_articles(self):
-        """Delete articles older than 7 days from MongoDB"""
+    async def cleanup_old_articles(self):
+        """Delete articles older than 7 days that the TTL monitor has not removed yet"""
         try:
-            seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            result = self.articles_collection.delete_many({'posted_at': {'$lt': seven_days_ago}})
+            seven_days_ago = datetime.utcnow() - timedelta(seconds=ARTICLE_TTL_SECONDS)
+            result = await self.articles_collection.delete_many({'posted_at': {'$lt': seven_days_ago}})
             deleted_count = result.deleted_count
-            logger.info(f"Cleaned up {deleted_count} old articles (older than 7 days)")
+            logger.info("Cleaned up %s old articles (older than 7 days)", deleted_count)
             return deleted_count
         except Exception as e:
-            logger.error(f"Error cleaning up old articles: {e}")
+            logger.error("Error cleaning up old articles: %s", e)
             return 0
     
-    def save_bot_status(self, status_data):
+    async def save_bot_status(self, status_data):
         """Save bot status to MongoDB"""
         try:
             status_doc = {
@@ -158,16 +219,16 @@ class MongoDBService:
                 'status': status_data.get('status', 'active'),
                 'error_message': status_data.get('error_message')
             }
-            result = self.bot_status_collection.insert_one(status_doc)
+            result = await self.bot_status_collection.insert_one(status_doc)
             return str(result.inserted_id)
         except Exception as e:
-            logger.error(f"Error saving bot status: {e}")
+            logger.error("Error saving bot status: %s", e)
             return None
     
-    def get_latest_bot_status(self):
+    async def get_latest_bot_status(self):
         """Get latest bot status from MongoDB"""
         try:
-            status = self.bot_status_collection.find_one(sort=[('last_run', -1)])
+            status = await self.bot_status_collection.find_one(sort=[('last_run', -1)])
             if status:
                 return {
                     'id': str(status['_id']),
@@ -178,54 +239,57 @@ class MongoDBService:
                 }
             return None
         except Exception as e:
-            logger.error(f"Error fetching bot status: {e}")
+            logger.error("Error fetching bot status: %s", e)
             return None
     
-    def get_statistics(self):
+    async def get_statistics(self):
         """Get bot statistics from MongoDB"""
         try:
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_end = today_start + timedelta(days=1)
+            today_start, today_end = _today_window()
             
-            total_articles = self.articles_collection.count_documents({'is_posted': True})
-            today_articles = self.articles_collection.count_documents({
-                'is_posted': True,
-                'posted_at': {'$gte': today_start, '$lt': today_end}
-            })
+            # Both counts in one round-trip; the leading $match can use the {is_posted: 1, posted_at: -1} index
+            result = await self.articles_collection.aggregate([
+                {'$match': {'is_posted': True}},
+                {'$facet': {
+                    'total': [{'$count': 'n'}],
+                    'today': [
+                        {'$match': {'posted_at': {'$gte': today_start, '$lt': today_end}}},
+                        {'$count': 'n'}
+                    ]
+                }}
+            ]).to_list(1)
+            counts = result[0] if result else {}
             
             return {
-                'total_articles_posted': total_articles,
-                'today_articles_posted': today_articles
+                'total_articles_posted': counts['total'][0]['n'] if counts.get('total') else 0,
+                'today_articles_posted': counts['today'][0]['n'] if counts.get('today') else 0
             }
         except Exception as e:
-            logger.error(f"Error fetching statistics: {e}")
+            logger.error("Error fetching statistics: %s", e)
             return {'total_articles_posted': 0, 'today_articles_posted': 0}
     
-    def setup_scheduled_tasks(self):
+    async def setup_scheduled_tasks(self):
         """Setup scheduled tasks in MongoDB - Hourly news fetching"""
-        tasks = []
-        
-        # Create hourly news fetching tasks (24 hours)
-        for hour in range(24):
-            tasks.append({
-                'name': f'cricket_news_hour_{hour:02d}',
+        tasks = [
+            {
+                'name': 'cricket_news_hourly',
                 'task': 'fetch_and_post_cricket_news',
-                'schedule': {'hour': hour, 'minute': 0},
+                'schedule': {'minute': 0},
                 'enabled': True,
                 'last_run': None
-            })
+            }
+        ]
         
-        # Daily cleanup task at 3:00 AM UTC
-        tasks.append({
-            'name': 'cleanup_old_articles_daily',
-            'task': 'cleanup_old_articles',
-            'schedule': {'hour': 3, 'minute': 0},
-            'enabled': True,
-            'last_run': None
+        # Drop rows left behind by the old polling scheduler and the retired daily cleanup
+        await self.scheduler_collection.delete_many({
+            '$or': [
+                {'name': {'$regex': '^cricket_news_hour_'}},
+                {'name': 'cleanup_old_articles_daily'}
+            ]
         })
         
         for task in tasks:
-            self.scheduler_collection.update_one(
+            await self.scheduler_collection.update_one(
                 {'name': task['name']},
                 {'$setOnInsert': task},
                 upsert=True
@@ -233,25 +297,23 @@ class MongoDBService:
         
         logger.info("✅ Scheduled tasks setup completed")
     
-    def get_scheduled_tasks(self):
+    async def get_scheduled_tasks(self):
         """Get all scheduled tasks from MongoDB"""
         try:
-            return list(self.scheduler_collection.find({'enabled': True}))
+            return await self.scheduler_collection.find(
+                {'enabled': True},
+                projection={'_id': 0, 'name': 1, 'schedule': 1, 'enabled': 1, 'last_run': 1}
+            ).to_list(None)
         except Exception as e:
-            logger.error(f"Error fetching scheduled tasks: {e}")
+            logger.error("Error fetching scheduled tasks: %s", e)
             return []
     
-    def update_task_last_run(self, task_name):
+    async def update_task_last_run(self, task_name):
         """Update task last run time in MongoDB"""
         try:
-            self.scheduler_collection.update_one(
+            await self.scheduler_collection.update_one(
                 {'name': task_name},
                 {'$set': {'last_run': datetime.utcnow()}}
             )
         except Exception as e:
-            logger.error(f"Error updating task last run: {e}")
-    
-    def close_connection(self):
-        """Close MongoDB connection"""
-        if hasattr(self, 'client'):
-            self.client.close()
+            logger.error("Error updating task last run: %s", e)
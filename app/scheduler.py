@@ -1,152 +1,98 @@
-import threading
-import time
-from datetime import datetime, timedelta
-from app.mongodb_service import MongoDBService
-from app.tasks import fetch_and_post_cricket_news, cleanup_old_articles
+from datetime import datetime
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from app.tasks import fetch_and_post_cricket_news
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MongoDBScheduler:
     def __init__(self):
-        self.mongodb_service = MongoDBService()
-        self.running = False
-        self.thread = None
-        
-    def setup_scheduled_tasks(self):
+        self.mongodb_service = None
+        self.sched = None
+    
+    @property
+    def running(self):
+        return self.sched is not None and self.sched.running
+    
+    async def setup_scheduled_tasks(self):
         """Setup scheduled tasks using MongoDB service"""
         try:
-            self.mongodb_service.setup_scheduled_tasks()
+            await self.mongodb_service.setup_scheduled_tasks()
             logger.info("✅ Scheduled tasks setup completed")
         except Exception as e:
-            logger.error(f"❌ Error setting up scheduled tasks: {e}")
-    
-    def should_run_task(self, task):
-        now = datetime.utcnow().replace(second=0, microsecond=0)
-        schedule = task['schedule']
-        task_time = now.replace(hour=schedule['hour'], minute=schedule['minute'])
-        
-        # Allow 2 minutes tolerance
-        time_diff = abs((now - task_time).total_seconds())
-        if time_diff > 120:
-            return False
-        
-        last_run = task.get('last_run')
-        if last_run:
-            last_run_dt = last_run if isinstance(last_run, datetime) else datetime.fromisoformat(last_run)
-            
-            task_name = task.get('name', '')
-            if 'cleanup' in task_name:
-                min_interval = 23 * 3600  # 23 hours for daily tasks
-            else:
-                min_interval = 50 * 60    # 50 minutes for hourly tasks
-            
-            if (now - last_run_dt).total_seconds() < min_interval:
-                return False
-        
-        return True
+            logger.error("❌ Error setting up scheduled tasks: %s", e)
     
-    def run_task(self, task):
+    async def run_task(self, task_name, task_func):
         """Execute the scheduled task"""
-        task_name = task.get('task', 'unknown')
-        task_display_name = task.get('name', task_name)
-        
         try:
-            logger.info(f"🚀 STARTING scheduled task: {task_display_name}")
+            logger.info("🚀 STARTING scheduled task: %s", task_name)
             start_time = datetime.utcnow()
             
-            result = None
-            if task_name == 'fetch_and_post_cricket_news':
-                result = fetch_and_post_cricket_news()
-            elif task_name == 'cleanup_old_articles':
-                result = cleanup_old_articles()
-            else:
-                logger.error(f"❌ Unknown task: {task_name}")
-                return
+            result = await task_func(self.mongodb_service)
             
             try:
-                self.mongodb_service.update_task_last_run(task['name'])
+                await self.mongodb_service.update_task_last_run(task_name)
             except Exception as e:
-                logger.error(f"❌ Failed to update last run time: {e}")
+                logger.error("❌ Failed to update last run time: %s", e)
             
             end_time = datetime.utcnow()
             duration = (end_time - start_time).total_seconds()
             
-            logger.info(f"✅ COMPLETED task: {task_display_name} in {duration:.1f}s")
-            logger.info(f"📊 Task result: {result}")
-            
+            logger.info("✅ COMPLETED task: %s in %.1fs", task_name, duration)
+            logger.info("📊 Task result: %s", result)
+        
         except Exception as e:
-            logger.error(f"❌ FAILED task {task_display_name}: {e}")
+            logger.error("❌ FAILED task %s: %s", task_name, e)
             
             try:
-                self.mongodb_service.update_task_last_run(task['name'])
+                await self.mongodb_service.update_task_last_run(task_name)
             except:
                 pass
     
-    def scheduler_loop(self):
-        """Main scheduler loop"""
-        logger.info("🕐 MongoDB Scheduler loop started")
-        loop_count = 0
-        
-        while self.running:
-            try:
-                loop_count += 1
-                current_time = datetime.utcnow()
-                
-                if loop_count % 10 == 0:
-                    logger.info(f"💓 Scheduler heartbeat #{loop_count} at {current_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-                
-                tasks = self.mongodb_service.get_scheduled_tasks()
-                
-                if not tasks and loop_count % 10 == 0:
-                    logger.warning("⚠️ No scheduled tasks found")
-                
-                for task in tasks:
-                    if self.should_run_task(task):
-                        logger.info(f"🎯 Task '{task['name']}' is due to run!")
-                        task_thread = threading.Thread(
-                            target=self.run_task,
-                            args=(task,),
-                            name=f"Task-{task['name']}"
-                        )
-                        task_thread.daemon = True
-                        task_thread.start()
-                
-                time.sleep(60)
-                
-            except Exception as e:
-                logger.error(f"❌ Error in scheduler loop: {e}")
-                time.sleep(30)
-        
-        logger.info("🛑 Scheduler loop ended")
-    
-    def start(self):
+    async def start(self, mongodb_service):
         """Start the scheduler"""
         if not self.running:
             logger.info("🔄 Starting the MongoDB Scheduler...")
-            self.running = True
+            self.mongodb_service = mongodb_service
             try:
-                self.setup_scheduled_tasks()
+                await self.setup_scheduled_tasks()
             except Exception as e:
-                logger.error(f"❌ Failed to set up scheduled tasks: {e}")
-                self.running = False
+                logger.error("❌ Failed to set up scheduled tasks: %s", e)
                 return
-
+            
             try:
-                self.thread = threading.Thread(target=self.scheduler_loop)
-                self.thread.daemon = True
-                self.thread.start()
+                # max_instances=1 + coalesce keep an overrunning job from being started twice.
+                # misfire_grace_time keeps the old loop's 2 minute tolerance for a late wakeup.
+                # Old articles are expired by the TTL index on posted_at, so there is no cleanup job.
+                self.sched = AsyncIOScheduler(timezone='UTC')
+                self.sched.add_job(
+                    self.run_task,
+                    CronTrigger(minute=0),
+                    args=['cricket_news_hourly', fetch_and_post_cricket_news],
+                    id='news',
+                    name='cricket_news_hourly',
+                    max_instances=1,
+                    coalesce=True,
+                    misfire_grace_time=120
+                )
+                self.sched.start()
                 logger.info("📅 MongoDB Scheduler started successfully")
             except Exception as e:
-                logger.error(f"❌ Failed to start scheduler thread: {e}")
-                self.running = False
-
-    def stop(self):
+                logger.error("❌ Failed to start scheduler: %s", e)
+                self.sched = None
+    
+    def get_next_run_times(self):
+        """Next fire time of each job keyed by task name, as tracked by APScheduler"""
+        if not self.running:
+            return {}
+        return {job.name: job.next_run_time for job in self.sched.get_jobs()}
+    
+    async def stop(self):
         """Stop the scheduler"""
         logger.info("🛑 Stopping the MongoDB Scheduler...")
-        self.running = False
-        if self.thread:
-            self.thread.join()
+        if self.sched:
+            self.sched.shutdown(wait=False)
             logger.info("✅ Scheduler stopped")
 
 # Global scheduler instance
@@ -1,144 +1,300 @@
-import requests
-import feedparser
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
+from lxml import etree
+from selectolax.parser import HTMLParser
 from app.config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+}
+_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+_GENERIC_KEYWORDS = ('logo', 'icon', 'placeholder', 'spacer', 'default')
+# One selector list matching exactly the meta tags we read, so the head is walked once
+_META_SELECTOR = ', '.join((
+    'head > meta[property="og:image"]',
+    'head > meta[name="twitter:image"]',
+    'head > meta[property="og:description"]',
+    'head > meta[name="description"]',
+))
+_BODY_IMAGE_SELECTORS = ('.story-image img', '.article-image img', 'article img', 'img[src*="cricket"]')
+_BODY_DESCRIPTION_SELECTORS = ('.story-intro', 'article p:first-of-type')
+_HEAD_END = b'</head>'
+_CHUNK_SIZE = 16384
+_ARTICLES_PER_RUN = 5
+_EXTRACT_WORKERS = 5
+_IMAGE_CHECK_TIMEOUT = 3.0
+# Overrides the page-navigation headers for the image HEAD check
+_IMAGE_HEADERS = {
+    'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    'Sec-Fetch-Dest': 'image',
+    'Sec-Fetch-Mode': 'no-cors',
+}
+# Servers that don't implement HEAD say nothing about the image itself
+_HEAD_UNSUPPORTED = frozenset({405, 501})
+
+# One HTTP/2 client per process: the feed and every article page share a single connection
+_client = None
+
+def _get_client():
+    """Lazily create the shared HTTP client"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=_HEADERS,
+            timeout=10.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client"""
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+
+def _classify_image(url):
+    """True for an image URL that isn't a generic placeholder (lowercases the URL once)"""
+    if not url:
+        return False
+    url_lower = url.lower()
+    return url_lower.endswith(_IMAGE_EXTS) and not any(keyword in url_lower for keyword in _GENERIC_KEYWORDS)
+
 class NewsFetcher:
     def __init__(self):
         self.espn_rss_url = settings.ESPN_RSS_URL
+        
+        # Validators of the last feed response, for conditional GETs on later runs
+        self._feed_etag = None
+        self._feed_last_modified = None
 
-    def is_valid_image_url(self, url):
-        """Check if URL is a valid image"""
-        if not url:
+    async def extract_article_content(self, url):
+        """Extract image and description from article page"""
+        image_url, description = await self._read_article_page(url)
+        
+        # Drop dead or non-image URLs here rather than letting Telegram fail to fetch them
+        if image_url and not await self.is_reachable_image(image_url):
+            logger.info("Discarding unreachable image: %s", image_url)
+            image_url = None
+        
+        return image_url, description
+    
+    async def is_reachable_image(self, url):
+        """HEAD the image URL; False only when it is definitely an error or not an image"""
+        try:
+            response = await _get_client().head(url, headers=_IMAGE_HEADERS, timeout=_IMAGE_CHECK_TIMEOUT)
+        except Exception as e:
+            # Inconclusive; Telegram may still be able to fetch it
+            logger.warning("Image check failed for %s: %s", url, e)
+            return True
+        
+        if response.status_code in _HEAD_UNSUPPORTED:
+            return True
+        if response.status_code >= 400:
             return False
-        return url.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif'))
+        content_type = response.headers.get('content-type')
+        return not content_type or content_type.startswith('image/')
+    
+    async def _read_article_page(self, url):
+        """Fetch the article page, reading past </head> only when the head lacks the image or description"""
+        try:
+            async with _get_client().stream('GET', url) as response:
+                if response.status_code != 200:
+                    logger.warning("Failed to fetch article page: %s", response.status_code)
+                    return None, None
+                
+                # The meta tags live in <head>, so stop reading once it has arrived
+                buf = bytearray()
+                chunks = response.aiter_bytes(_CHUNK_SIZE)
+                async for chunk in chunks:
+                    search_from = max(0, len(buf) - len(_HEAD_END))
+                    buf.extend(chunk)
+                    if buf.find(_HEAD_END, search_from) != -1:
+                        break
+                else:
+                    return self.parse_article_page(bytes(buf))
+                
+                image_url, description = self.parse_article_page(bytes(buf))
+                if image_url and description:
+                    return image_url, description
+                
+                # Head didn't have both; read the rest so the body selectors can run
+                async for chunk in chunks:
+                    buf.extend(chunk)
 
-    def is_generic_image(self, url):
-        """Check if image is a generic placeholder"""
-        if not url:
-            return True
-        generic_keywords = ['logo', 'icon', 'placeholder', 'spacer', 'default']
-        return any(keyword in url.lower() for keyword in generic_keywords)
+            return self.parse_article_page(bytes(buf))
 
-    def extract_article_content(self, url):
-        """Extract image and description from article page"""
+        except Exception as e:
+            logger.error("Error extracting content from %s: %s", url, e)
+            return None, None
+
+    def parse_article_page(self, content):
+        """Pick the article image and description out of the page HTML"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Cache-Control': 'max-age=0',
-            }
-
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code != 200:
-                logger.warning(f"Failed to fetch article page: {response.status_code}")
-                return None, None
+            tree = HTMLParser(content)
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # One pass over the matching <meta> tags collects all the candidates they provide
+            meta = {}
+            for node in tree.css(_META_SELECTOR):
+                key = node.attributes.get('property') or node.attributes.get('name')
+                if key not in meta:
+                    meta[key] = node.attributes.get('content')
 
             # Extract image
             image_url = None
-            image_selectors = [
-                'meta[property="og:image"]',
-                'meta[name="twitter:image"]',
-                '.story-image img',
-                '.article-image img',
-                'article img',
-                'img[src*="cricket"]',
-            ]
+            for found_image_url in self._image_candidates(tree, meta):
+                if found_image_url:
+                    if found_image_url.startswith('//'):
+                        found_image_url = 'https:' + found_image_url
+                    elif found_image_url.startswith('/'):
+                        found_image_url = 'https://www.espncricinfo.com' + found_image_url
 
-            for selector in image_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    found_image_url = element.get('content') or element.get('src')
-                    if found_image_url:
-                        if found_image_url.startswith('//'):
-                            found_image_url = 'https:' + found_image_url
-                        elif found_image_url.startswith('/'):
-                            found_image_url = 'https://www.espncricinfo.com' + found_image_url
-
-                        if self.is_valid_image_url(found_image_url) and not self.is_generic_image(found_image_url):
-                            image_url = found_image_url
-                            break
+                    if _classify_image(found_image_url):
+                        image_url = found_image_url
+                        break
 
             # Extract description
             description = None
-            description_selectors = [
-                'meta[property="og:description"]',
-                'meta[name="description"]',
-                '.story-intro',
-                'article p:first-of-type',
-            ]
-
-            for selector in description_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    desc_text = element.get('content') or element.get_text(strip=True)
-                    if desc_text and len(desc_text) > 50:
-                        description = desc_text
-                        break
+            for desc_text in self._description_candidates(tree, meta):
+                if desc_text and len(desc_text) > 50:
+                    description = desc_text
+                    break
 
             return image_url, description
 
         except Exception as e:
-            logger.error(f"Error extracting content from {url}: {e}")
+            logger.error("Error parsing article page: %s", e)
             return None, None
 
-    def fetch_cricket_news(self):
+    def _image_candidates(self, tree, meta):
+        """Image URLs in priority order; body selectors only run if the meta tags don't pan out"""
+        yield meta.get('og:image')
+        yield meta.get('twitter:image')
+        for selector in _BODY_IMAGE_SELECTORS:
+            element = tree.css_first(selector)
+            if element:
+                yield element.attributes.get('src')
+
+    def _description_candidates(self, tree, meta):
+        """Descriptions in priority order; body selectors only run if the meta tags don't pan out"""
+        yield meta.get('og:description')
+        yield meta.get('description')
+        for selector in _BODY_DESCRIPTION_SELECTORS:
+            element = tree.css_first(selector)
+            if element:
+                yield element.text(strip=True)
+
+    async def stream_feed_entries(self, queue, max_entries):
+        """Push (index, entry) pairs from the RSS feed onto the queue as they are parsed; returns the count"""
+        headers = {}
+        if self._feed_etag:
+            headers['If-None-Match'] = self._feed_etag
+        if self._feed_last_modified:
+            headers['If-Modified-Since'] = self._feed_last_modified
+        
+        async with _get_client().stream('GET', self.espn_rss_url, headers=headers) as response:
+            if response.status_code == 304:
+                # Every entry was already saved by the run that fetched it, so there is nothing to extract
+                logger.info("📰 ESPN RSS not modified since last fetch")
+                return 0
+            if response.status_code != 200:
+                logger.error("Failed to fetch ESPN RSS: %s", response.status_code)
+                return 0
+            
+            # Items are handed to the extraction workers while the rest of the feed is still downloading
+            parser = etree.XMLPullParser(events=('end',), tag='item', resolve_entities=False, no_network=True, recover=True)
+            entries = []
+            async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                parser.feed(chunk)
+                for _, item in parser.read_events():
+                    entry = {
+                        'title': (item.findtext('title') or '').strip(),
+                        'link': (item.findtext('link') or '').strip(),
+                        'summary': (item.findtext('description') or '').strip()
+                    }
+                    item.clear()
+                    
+                    # Items without a title or link can't be stored or fetched
+                    if not entry['title'] or not entry['link']:
+                        logger.warning("Skipping RSS item without title or link")
+                        continue
+                    
+                    queue.put_nowait((len(entries), entry))
+                    entries.append(entry)
+                    if len(entries) >= max_entries:
+                        break
+                if len(entries) >= max_entries:
+                    break
+            
+            self._feed_etag = response.headers.get('ETag')
+            self._feed_last_modified = response.headers.get('Last-Modified')
+        
+        return len(entries)
+    
+    async def _extract_worker(self, queue, results):
+        """Pull feed entries off the queue and extract their article pages"""
+        while True:
+            index, item = await queue.get()
+            try:
+                results[index] = (item, await self.extract_article_content(item.get('link')))
+            finally:
+                queue.task_done()
+    
+    async def fetch_cricket_news(self):
         """Fetch cricket news from ESPN RSS feed"""
         try:
             logger.info("🏏 Fetching cricket news from ESPN RSS...")
-            feed = feedparser.parse(self.espn_rss_url)
-            
-            if not feed.entries:
-                logger.error("No entries found in ESPN RSS feed")
-                return []
             
-            logger.info(f"📰 Found {len(feed.entries)} articles in ESPN RSS")
+            queue = asyncio.Queue()
+            results = {}
             
-            articles = []
-            max_articles = min(10, len(feed.entries))
+            workers = [
+                asyncio.create_task(self._extract_worker(queue, results))
+                for _ in range(_EXTRACT_WORKERS)
+            ]
+            try:
+                # Every entry becomes an article (the RSS summary covers a failed extraction),
+                # so only the first five are ever fetched
+                entry_count = await self.stream_feed_entries(queue, _ARTICLES_PER_RUN)
+                
+                if not entry_count:
+                    logger.warning("No new entries in ESPN RSS feed")
+                    return []
+                
+                logger.info("📰 Found %s articles in ESPN RSS", entry_count)
+                
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
             
-            for i, item in enumerate(feed.entries[:max_articles]):
-                try:
-                    # Extract image and description from article page
-                    image_url, description = self.extract_article_content(item.link)
-                    
-                    # Use RSS summary if no description extracted
-                    if not description and hasattr(item, 'summary'):
-                        description = item.summary
-                    
-                    articles.append({
-                        'title': item.title,
-                        'link': item.link,
-                        'image_url': image_url,
-                        'description': description,
-                        'source': 'ESPN'
-                    })
-                    
-                    # Stop after getting 5 articles
-                    if len(articles) >= 5:
-                        break
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error processing article {i+1}: {e}")
-                    continue
+            # Results are keyed by feed position; the RSS summary stands in for a missing description
+            articles = [
+                {
+                    'title': item['title'],
+                    'link': item['link'],
+                    'image_url': image_url,
+                    'description': description or item['summary'] or None,
+                    'source': 'ESPN'
+                }
+                for item, (image_url, description) in (results[i] for i in sorted(results))
+            ]
             
-            logger.info(f"✅ Successfully fetched {len(articles)} articles from ESPN")
+            logger.info("✅ Successfully fetched %s articles from ESPN", len(articles))
             return articles
             
         except Exception as e:
-            logger.error(f"❌ ESPN RSS fetch failed: {e}")
+            logger.error("❌ ESPN RSS fetch failed: %s", e)
             return []
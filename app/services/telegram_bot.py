@@ -1,27 +1,102 @@
-import requests
+import asyncio
 import time
+import aiohttp
+import orjson
 from app.config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Transient Bot API failures are retried with exponential backoff (or Telegram's retry_after).
+# Sends (POST) are only retried on 429: a 5xx from the gateway doesn't mean the message
+# wasn't delivered, so retrying it could post the same article twice.
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRIES = 3
+_BACKOFF_FACTOR = 0.5
+
+# Telegram allows about one message per second per chat
+_SEND_INTERVAL = 1.0
+
+async def _json(response):
+    """Decode a Bot API response body with orjson ({} for non-JSON bodies)"""
+    if response.content_type != 'application/json':
+        return {}
+    return orjson.loads(await response.read())
+
+def _compose(article, description_limit):
+    """Build the HTML post text in one go: title, truncated description (if any) and link"""
+    description = article.get('description')
+    if description:
+        if len(description) > description_limit:
+            description = description[:description_limit] + "..."
+        return f"<b>{article['title']}</b>\n\n{description}\n\n<a href=\"{article['link']}\">Read full article</a>"
+    return f"<b>{article['title']}</b>\n\n<a href=\"{article['link']}\">Read full article</a>"
+
 class TelegramBot:
+    # getMe result, shared across instances; the bot's identity doesn't change while the token is valid
+    _bot_info = None
+    
     def __init__(self):
         self.bot_token = settings.BOT_TOKEN
         self.chat_id = settings.CHAT_ID
         self.api_base = f'https://api.telegram.org/bot{self.bot_token}'
+        
+        # One keep-alive session so a batch of posts shares a single TLS connection
+        self.session = None
+        
+        # Earliest monotonic time the next send may start
+        self._next_send_time = time.monotonic()
     
-    def send_message(self, article):
-        """Send article as text message (when no image available)"""
-        try:
-            message = f"<b>{article['title']}</b>"
+    def _get_session(self):
+        """Lazily create the HTTP session (it must be created inside the running event loop)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=4))
+        return self.session
+    
+    async def close(self):
+        """Close the HTTP session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    async def _wait_for_send_slot(self):
+        """Reserve the next free send slot, then sleep until it starts"""
+        # Reserve before sleeping so concurrent batches on this bot get distinct slots
+        now = time.monotonic()
+        slot = max(now, self._next_send_time)
+        self._next_send_time = slot + _SEND_INTERVAL
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def _call(self, http_method, api_method, data=None, timeout=30):
+        """Call a Bot API method and return (status, json body)"""
+        session = self._get_session()
+        url = f'{self.api_base}/{api_method}'
+        
+        for attempt in range(_MAX_RETRIES + 1):
+            async with session.request(http_method, url, data=data, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                status = response.status
+                retry_after = response.headers.get('Retry-After')
+                result = await _json(response)
+            
+            if status == 401:
+                # Token was revoked; make the next get_bot_info check it again
+                TelegramBot._bot_info = None
             
-            if article.get('description'):
-                description = article['description'][:300] + "..." if len(article['description']) > 300 else article['description']
-                message += f"\n\n{description}"
+            retryable = status == 429 or (http_method == 'GET' and status in _RETRY_STATUSES)
+            if not retryable or attempt == _MAX_RETRIES:
+                return status, result
             
-            message += f"\n\n<a href=\"{article['link']}\">Read full article</a>"
+            # Flood control puts the wait in the body; the connection is released before sleeping
+            retry_after = (result.get('parameters') or {}).get('retry_after') or retry_after
+            delay = float(retry_after) if retry_after else _BACKOFF_FACTOR * (2 ** attempt)
+            logger.warning("Telegram %s returned %s, retrying in %.1fs", api_method, status, delay)
+            await asyncio.sleep(delay)
+    
+    async def send_message(self, article):
+        """Send article as text message (when no image available)"""
+        try:
+            message = _compose(article, 300)
             
             if len(message) > 4096:
                 message = message[:4090] + "..."
@@ -33,32 +108,25 @@ class TelegramBot:
                 'disable_web_page_preview': False
             }
             
-            logger.info(f"📤 Sending text message: {article['title'][:30]}...")
+            logger.info("📤 Sending text message: %s...", article['title'][:30])
             
-            response = requests.post(f'{self.api_base}/sendMessage', data=payload, timeout=30)
-            result = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+            status, result = await self._call('POST', 'sendMessage', data=payload)
             
-            if response.status_code == 200 and result.get('ok'):
-                logger.info(f"✅ Successfully sent text message")
+            if status == 200 and result.get('ok'):
+                logger.info("✅ Successfully sent text message")
                 return result
             else:
                 error_description = result.get('description', 'Unknown error')
                 raise Exception(f"Telegram API error: {error_description}")
                 
         except Exception as e:
-            logger.error(f"❌ Error sending text message: {e}")
+            logger.error("❌ Error sending text message: %s", e)
             raise e
 
-    def send_photo(self, article):
+    async def send_photo(self, article):
         """Send a single article as photo with caption"""
         try:
-            caption = f"<b>{article['title']}</b>"
-            
-            if article.get('description'):
-                description = article['description'][:200] + "..." if len(article['description']) > 200 else article['description']
-                caption += f"\n\n{description}"
-            
-            caption += f"\n\n<a href=\"{article['link']}\">Read full article</a>"
+            caption = _compose(article, 200)
             
             if len(caption) > 1024:
                 caption = caption[:1020] + "..."
@@ -70,60 +138,62 @@ class TelegramBot:
                 'parse_mode': 'HTML'
             }
             
-            logger.info(f"📤 Sending photo: {article['title'][:30]}...")
+            logger.info("📤 Sending photo: %s...", article['title'][:30])
             
-            response = requests.post(f'{self.api_base}/sendPhoto', data=payload, timeout=30)
-            result = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+            status, result = await self._call('POST', 'sendPhoto', data=payload)
             
-            if response.status_code == 200 and result.get('ok'):
-                logger.info(f"✅ Successfully sent photo")
+            if status == 200 and result.get('ok'):
+                logger.info("✅ Successfully sent photo")
                 return result
             else:
                 error_description = result.get('description', 'Unknown error')
                 raise Exception(f"Telegram API error: {error_description}")
                 
         except Exception as e:
-            logger.error(f"❌ Error sending photo: {e}")
+            logger.error("❌ Error sending photo: %s", e)
             raise e
 
-    def post_articles(self, articles):
-        """Post multiple articles with delay"""
+    async def post_articles(self, articles):
+        """Post multiple articles, starting one send per second"""
         posted_count = 0
+        sends = []
         
-        logger.info(f"📤 Starting to post {len(articles)} articles to Telegram...")
+        logger.info("📤 Starting to post %s articles to Telegram...", len(articles))
         
+        # Pace the starts of the sends rather than waiting for each response before the delay
         for i, article in enumerate(articles):
-            try:
-                logger.info(f"📸 Posting article {i+1}/{len(articles)}")
-                
-                if article.get('image_url'):
-                    self.send_photo(article)
-                else:
-                    self.send_message(article)
-                
+            await self._wait_for_send_slot()
+            
+            logger.info("📸 Posting article %s/%s", i+1, len(articles))
+            
+            if article.get('image_url'):
+                sends.append(asyncio.create_task(self.send_photo(article)))
+            else:
+                sends.append(asyncio.create_task(self.send_message(article)))
+        
+        for result in await asyncio.gather(*sends, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("❌ Failed to send article: %s", result)
+            else:
                 posted_count += 1
-                
-                if i < len(articles) - 1:
-                    time.sleep(1)
-                    
-            except Exception as e:
-                logger.error(f"❌ Failed to send article: {e}")
-                continue
         
-        logger.info(f"🎉 Completed posting {posted_count}/{len(articles)} articles")
+        logger.info("🎉 Completed posting %s/%s articles", posted_count, len(articles))
         return posted_count
     
-    def get_bot_info(self):
-        """Get bot information for testing"""
+    async def get_bot_info(self):
+        """Get bot information for testing (cached after the first successful call)"""
+        if TelegramBot._bot_info is not None:
+            return TelegramBot._bot_info
+        
         try:
-            response = requests.get(f'{self.api_base}/getMe', timeout=10)
-            result = response.json()
+            status, result = await self._call('GET', 'getMe', timeout=10)
             
-            if response.status_code == 200 and result.get('ok'):
-                return result.get('result', {})
+            if status == 200 and result.get('ok'):
+                TelegramBot._bot_info = result.get('result', {})
+                return TelegramBot._bot_info
             else:
                 return None
                 
         except Exception as e:
-            logger.error(f"❌ Error getting bot info: {e}")
+            logger.error("❌ Error getting bot info: %s", e)
             return None
@@ -1,81 +1,99 @@
 from datetime import datetime
-from app.mongodb_service import MongoDBService
 from app.services.news_fetcher import NewsFetcher
 from app.services.telegram_bot import TelegramBot
 import logging
 
 logger = logging.getLogger(__name__)
 
-def fetch_and_post_cricket_news():
+# Long-lived so the Telegram keep-alive session and pacing survive between hourly runs
+_news_fetcher = None
+_telegram_bot = None
+
+def _get_services():
+    """Lazily create the news fetcher and Telegram bot shared by every run"""
+    global _news_fetcher, _telegram_bot
+    if _news_fetcher is None:
+        _news_fetcher = NewsFetcher()
+    if _telegram_bot is None:
+        _telegram_bot = TelegramBot()
+    return _news_fetcher, _telegram_bot
+
+async def close_services():
+    """Close the HTTP sessions held by the shared services"""
+    if _telegram_bot is not None:
+        await _telegram_bot.close()
+
+async def fetch_and_post_cricket_news(mongodb_service):
     """Task to fetch and post cricket news (Hourly execution)"""
-    mongodb_service = MongoDBService()
+    news_fetcher, telegram_bot = _get_services()
     
     try:
         logger.info("🏏 Starting hourly cricket news fetch and post task...")
         
-        news_fetcher = NewsFetcher()
-        telegram_bot = TelegramBot()
-        
         # Test Telegram bot
         logger.info("🤖 Testing Telegram bot connection...")
-        bot_info = telegram_bot.get_bot_info()
+        bot_info = await telegram_bot.get_bot_info()
         if not bot_info:
             raise Exception("Failed to connect to Telegram bot")
-        logger.info(f"✅ Telegram bot connected: @{bot_info.get('username', 'unknown')}")
+        logger.info("✅ Telegram bot connected: @%s", bot_info.get('username', 'unknown'))
         
         # Fetch news
         logger.info("📰 Fetching latest cricket news...")
-        articles = news_fetcher.fetch_cricket_news()
+        articles = await news_fetcher.fetch_cricket_news()
         
         if not articles:
             logger.warning("❌ No articles found")
-            mongodb_service.save_bot_status({
+            await mongodb_service.save_bot_status({
                 'articles_posted': 0,
                 'status': 'success',
                 'error_message': 'No articles found'
             })
             return {"status": "success", "message": "No articles found"}
         
-        logger.info(f"📄 Found {len(articles)} articles")
+        logger.info("📄 Found %s articles", len(articles))
+        
+        # Save all articles in one round-trip; only the freshly inserted ones are new
+        for article_data in articles:
+            article_data['is_posted'] = False
+        upserted_ids = await mongodb_service.save_articles_bulk(articles)
         
         # Filter new articles
         new_articles = []
-        for article_data in articles:
-            if not mongodb_service.article_exists(article_data['title'], article_data['source']):
-                article_data['is_posted'] = False
-                mongodb_service.save_article(article_data)
+        for index, article_data in enumerate(articles):
+            if index in upserted_ids:
                 new_articles.append(article_data)
             else:
-                logger.info(f"⏭️ Skipping duplicate: {article_data['title'][:50]}...")
+                logger.info("⏭️ Skipping duplicate: %s...", article_data['title'][:50])
         
         if not new_articles:
             logger.info("ℹ️ No new articles to post")
-            mongodb_service.save_bot_status({
+            await mongodb_service.save_bot_status({
                 'articles_posted': 0,
                 'status': 'success',
                 'error_message': 'No new articles'
             })
             return {"status": "success", "message": "No new articles"}
         
-        logger.info(f"📤 Posting {len(new_articles)} new articles")
+        logger.info("📤 Posting %s new articles", len(new_articles))
         
         # Post to Telegram
-        posted_count = telegram_bot.post_articles(new_articles)
+        posted_count = await telegram_bot.post_articles(new_articles)
         
         if posted_count == 0:
             raise Exception("Failed to post any articles")
         
-        # Mark as posted
-        for article_data in new_articles:
-            mongodb_service.mark_article_posted(article_data['title'], article_data['source'])
+        # Mark as posted in one round-trip
+        await mongodb_service.mark_articles_posted(
+            [(article_data['title'], article_data['source']) for article_data in new_articles]
+        )
         
         # Update status
-        mongodb_service.save_bot_status({
+        await mongodb_service.save_bot_status({
             'articles_posted': posted_count,
             'status': 'success'
         })
         
-        logger.info(f"✅ Successfully posted {posted_count}/{len(new_articles)} articles")
+        logger.info("✅ Successfully posted %s/%s articles", posted_count, len(new_articles))
         
         return {
             "status": "success",
@@ -86,10 +104,10 @@ def fetch_and_post_cricket_news():
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in cricket news task: {e}")
+        logger.error("❌ Error in cricket news task: %s", e)
         
         try:
-            mongodb_service.save_bot_status({
+            await mongodb_service.save_bot_status({
                 'status': 'error',
                 'error_message': str(e),
                 'articles_posted': 0
@@ -102,23 +120,3 @@ def fetch_and_post_cricket_news():
             "message": str(e),
             "timestamp": datetime.utcnow().isoformat()
         }
-    
-    finally:
-        try:
-            mongodb_service.close_connection()
-        except:
-            pass
-
-def cleanup_old_articles():
-    """Task to clean up old articles (runs daily)"""
-    mongodb_service = MongoDBService()
-    
-    try:
-        cleaned_count = mongodb_service.cleanup_old_articles()
-        logger.info(f"🧹 Daily cleanup: removed {cleaned_count} old articles")
-        return {"status": "success", "cleaned_articles": cleaned_count}
-    except Exception as e:
-        logger.error(f"❌ Error in cleanup task: {e}")
-        return {"status": "error", "message": str(e)}
-    finally:
-        mongodb_service.close_connection()